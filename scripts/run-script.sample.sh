@@ -36,6 +36,8 @@ docker run --rm \
   -e OUTPUT_DIR=${OUTPUT_DIR} \
   -e OUTPUT_FORMAT=${OUTPUT_FORMAT} \
   -e LOG_MODE=${LOG_MODE} \
+  -e LLM_CACHE=${LLM_CACHE} \
+  -e ENABLE_CHECKPOINT=${ENABLE_CHECKPOINT} \
   -e AWS_ACCESS_KEY_ID=${AWS_ACCESS_KEY_ID} \
   -e AWS_SECRET_ACCESS_KEY=${AWS_SECRET_ACCESS_KEY} \
   -e AWS_SESSION_TOKEN=${AWS_SESSION_TOKEN} \
@@ -5,6 +5,7 @@ from pathlib import Path
 from video2article.pipeline import Pipeline
 from video2article.utils.constants import OutputFormat
 from video2article.utils.config import Config
+from video2article.utils.response_cache import CACHE_MODES
 
 
 async def process_video(config: Config) -> None:
@@ -27,16 +28,21 @@ async def main():
         'OUTPUT_FORMAT': os.getenv('OUTPUT_FORMAT'),
         'TRANSCRIBE_S3_BUCKET': os.getenv('TRANSCRIBE_S3_BUCKET'),
         'TARGET_LANGUAGE': os.getenv('TARGET_LANGUAGE'),
+        'LLM_CACHE': os.getenv('LLM_CACHE') or 'on',
+        'ENABLE_CHECKPOINT': os.getenv('ENABLE_CHECKPOINT'),
     }
     
     required_vars = {k: v for k, v in env_vars.items() 
-                    if k not in ['TRANSCRIBE_S3_BUCKET']}
+                    if k not in ['TRANSCRIBE_S3_BUCKET', 'ENABLE_CHECKPOINT']}
     missing_vars = [k for k, v in required_vars.items() if not v]
     if missing_vars:
         raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
     # Validate output format
     if env_vars['OUTPUT_FORMAT'] not in ['pdf']:
         raise ValueError("OUTPUT_FORMAT must be either 'pdf'")
+    # Validate LLM response cache mode
+    if env_vars['LLM_CACHE'] not in CACHE_MODES:
+        raise ValueError(f"LLM_CACHE must be one of {', '.join(CACHE_MODES)}")
     
     # Generate project name
     current_time = datetime.now().strftime("%Y%m%d%H%M")
@@ -55,6 +61,8 @@ async def main():
         transcribe_s3_bucket=env_vars['TRANSCRIBE_S3_BUCKET'],
         source_language=None,
         target_language=env_vars['TARGET_LANGUAGE'],
+        llm_cache=env_vars['LLM_CACHE'],
+        enable_checkpoint=(env_vars['ENABLE_CHECKPOINT'] or '').lower() in ['1', 'true', 'yes'],
     )
     
     try:
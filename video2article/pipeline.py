@@ -1,8 +1,9 @@
+import inspect
 import logging
 import os
 import time
 from pathlib import Path
-from typing import Union
+from typing import Any, Callable, Union
 
 from video2article.document_generators.pdf_generator import PDFGenerator
 from video2article.processors.image_tag_parser import ImageTagParser
@@ -11,10 +12,22 @@ from video2article.processors.thumbnail_content_extractor import ThumbnailConten
 from video2article.processors.transcript_revisor import TranscriptRevisor
 from video2article.processors.transcript_translator import TranscriptTranslator
 from video2article.processors.content_organizer import ContentOrganizer
+from video2article.utils.bedrock import configure_bedrock_client
+from video2article.utils.checkpoint import CHECKPOINT_VERSION, CheckpointStore
 from video2article.utils.config import Config
 from video2article.utils.language import should_translate
 from video2article.video_sources.file_source import FileSource
 from video2article.utils.logging import setup_logging
+from video2article.utils.response_cache import configure_response_cache, get_response_cache_stats
+
+# Thread pool sizes of the processors calling Bedrock
+MAX_WORKERS_KEYS = (
+    "processors.important_thumbnail_filter.filter_thumbnails_by_ml.max_workers",
+    "processors.thumbnail_content_extractor.extract_thumbnail_contents.max_workers",
+    "processors.transcript_revisor.revise.max_workers",
+    "processors.transcript_revisor.fix_paragraph_boundary.max_workers",
+    "processors.transcript_translator.translate.max_workers",
+)
 
 
 class Pipeline:
@@ -24,6 +37,18 @@ class Pipeline:
         # Create project folder if it does not exist
         os.makedirs(self.project_folder, exist_ok=True)
 
+        # The response cache is shared by all projects in the output directory so that re-runs can reuse it
+        configure_response_cache(Path(self.project_folder).parent / "llm_cache.sqlite3", config.llm_cache)
+
+        # Size the Bedrock connection pool for the processor with the most workers, with room for the revise and
+        # boundary-fix workers that run at the same time
+        max_workers = max(config.get_config_value(key) for key in MAX_WORKERS_KEYS)
+        configure_bedrock_client(2 * max_workers)
+
+        # Checkpoints are shared by all projects in the output directory as well, since each run gets a new project folder
+        self.checkpoints = CheckpointStore(Path(self.project_folder).parent / ".checkpoints") if config.enable_checkpoint else None
+        self._stage_key = ""
+
         # Only FileSource is supported
         self.video_source: FileSource = FileSource(config)
 
@@ -49,22 +74,23 @@ class Pipeline:
         # Load video source
         await self.video_source.load()
         logging.info("Video source loaded successfully")
+        self._stage_key = self._get_source_key()
 
         # Extract and process thumbnails
-        thumbnail_ids = self.important_thumbnail_filter.process(self.video_source.get_thumbnail_ids())
+        thumbnail_ids = await self._run_stage("important_thumbnail_filter", self.important_thumbnail_filter.process, self.video_source.get_thumbnail_ids())
         logging.info("Important thumbnails filtered successfully")
-        thumbnail_contents, keywords = self.thumbnail_content_extractor.process(thumbnail_ids)
+        thumbnail_contents, keywords = await self._run_stage("thumbnail_content_extractor", self.thumbnail_content_extractor.process, thumbnail_ids)
         logging.info("Thumbnail content extracted successfully ")
 
         # Revise transcript
-        revised_contents = self.revisor.process(self.video_source.get_captions(), thumbnail_contents, keywords)
+        revised_contents = await self._run_stage("transcript_revisor", self.revisor.process, self.video_source.get_captions(), thumbnail_contents, keywords)
         logging.info("Transcript revised successfully")
 
         # Translate transcript if needed
         if not self.config.source_language:
             raise ValueError("Source language is not set")
         if should_translate(self.config.source_language, self.config.target_language):
-            translated_contents = self.translator.process(revised_contents, thumbnail_contents, keywords)
+            translated_contents = await self._run_stage("transcript_translator", self.translator.process, revised_contents, thumbnail_contents, keywords)
             logging.info("Transcript translated successfully")
         else:
             translated_contents = revised_contents
@@ -74,7 +100,7 @@ class Pipeline:
         translated_output_contents = self.image_tag_parser.process(translated_contents)
 
         # Organize content (summary and chapters)
-        translated_output_contents = self.content_organizer.process(translated_output_contents)
+        translated_output_contents = await self._run_stage("content_organizer", self.content_organizer.process, translated_output_contents)
 
         # Save processed contents
         translated_output_contents.add_url(self.config.uri)
@@ -85,5 +111,50 @@ class Pipeline:
         self.pdf_generator.generate_document(self.config.project_name, translated_output_contents)
         logging.info("PDF document generated successfully")
 
+        cache_hits, cache_misses = get_response_cache_stats()
+        logging.info(f"LLM response cache: {cache_hits} hits, {cache_misses} misses")
+
         end_time = time.time()
         logging.info(f"Video processing completed: {int(end_time - start_time):d} seconds")
+
+    def _get_source_key(self) -> str:
+        """Compute the checkpoint key of the pipeline inputs"""
+        stat = os.stat(self.config.uri)
+        return CheckpointStore.make_key(
+            CHECKPOINT_VERSION,
+            os.path.abspath(self.config.uri),
+            stat.st_size,
+            stat.st_mtime_ns,
+            self.config.settings,
+            self.config.source_language,
+            self.config.target_language,
+        )
+
+    async def _run_stage(self, name: str, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a pipeline stage, reusing its checkpointed result if the stage was already run with the same inputs
+
+        Args:
+            name: Name of the stage
+            func: Function or coroutine function running the stage
+            *args: Arguments passed to the function
+
+        Returns:
+            Result of the stage
+        """
+        if self.checkpoints is None:
+            result = func(*args)
+            return await result if inspect.isawaitable(result) else result
+
+        # Each key is chained from the previous one, so it covers the inputs and settings of all earlier stages
+        self._stage_key = CheckpointStore.make_key(self._stage_key, name)
+        found, result = self.checkpoints.load(name, self._stage_key)
+        if found:
+            logging.info(f"Reusing checkpoint of stage: {name}")
+            return result
+
+        result = func(*args)
+        if inspect.isawaitable(result):
+            result = await result
+        self.checkpoints.save(name, self._stage_key, result)
+        return result
@@ -1,52 +1,20 @@
+import asyncio
+import json
 import logging
 import os
+import re
 from typing import Optional
 
 from video2article.utils.types import Contents, ContentType
 from video2article.utils.config import Config
-from video2article.utils.bedrock import create_message
+from video2article.utils.bedrock import acreate_message
 from video2article.utils.language import get_character_ratio
 
-class ContentOrganizer:
-    def __init__(self, config: Config):
-        self.config = config
-        self.project_folder = str(config.project_folder)
-        self.summary_model_id = config.get_config_value("processors.content_organizer.summary.model_id")
-        self.chapters_model_id = config.get_config_value("processors.content_organizer.chapters.model_id")
-
-    def process(self, contents: Contents) -> Contents:
-        logging.info("Starting content organization")
-        logging.info(f"Source language: {self.config.get_source_language_name()}")
-        logging.info(f"Target language: {self.config.get_target_language_name()}")
-
-        # Extract text content for processing
-        text_content = []
-        for content in contents.get_contents():
-            if content.type == ContentType.TEXT:
-                text_content.append(str(content.value))
-
-        # Generate summary
-        summary = self._generate_summary(text_content)
-        contents.add_summary(summary)
-
-        # Generate chapters
-        chapters = self._generate_chapters(text_content)
-        for chapter in chapters:
-            contents.add_chapter(chapter["title"], chapter["segment_start_id"] - 1, chapter["segment_end_id"] - 1)
-
-        logging.info("Content organization completed successfully")
-        return contents
+RESULT_PATTERN = re.compile(r'<result>(.*?)</result>', re.DOTALL)
+CODE_FENCE_PATTERN = re.compile(r'^```(?:json)?\s*|\s*```$')
+TRAILING_COMMA_PATTERN = re.compile(r',\s*([\]}])')
 
-    def _generate_summary(self, text_content: list[str]) -> str:
-        content = "\n".join(text_content)
-        target_lang = self.config.get_target_language_name()
-
-        # Calculate target length based on language ratios
-        source_ratio = get_character_ratio(self.config.source_language or "en")
-        target_ratio = get_character_ratio(self.config.target_language)
-        target_length = int(300 * (source_ratio / target_ratio))
-
-        prompt = f"""Please carefully read the content of the session transcript below and follow the instructions at the end.
+SUMMARY_PROMPT = """Please carefully read the content of the session transcript below and follow the instructions at the end.
 <content>
 {content}
 </content>
@@ -64,31 +32,14 @@ class ContentOrganizer:
 - Output the result within <result> tags. Do not include any other tags within the result, and do not output anything before or after the <result> tags.
 </instruction>"""
 
-        response = create_message(
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            max_tokens=4000,
-            stop_sequences=[],
-            model_id=self.summary_model_id
-        )
-
-        result = response.split("<result>")[1].split("</result>")[0].strip()
-        logging.debug(f"Generated summary: {result}")
-        return result
-
-    def _generate_chapters(self, text_content: list[str]) -> list[dict]:
-        text_contents = [f"<paragraph id=\"{i+1}\">\n{content}\n</paragraph>" for i, content in enumerate(text_content)]
-        formatted_contents = "\n".join(text_contents)
-        target_lang = self.config.get_target_language_name()
-
-        prompt = f"""Below is an article created from a presentation video transcript.
+CHAPTERS_PROMPT = """Below is an article created from a presentation video transcript.
 The article is divided into paragraphs, each provided as a paragraph element. Please read it carefully and follow the instructions below. Note that paragraph IDs are consecutive integers starting from 1.
 <article>
 {formatted_contents}
 </article>
 
 <instruction>
-Step 1. First, divide the entire article into approximately {len(text_content) // 8} segments (meaningful chunks of consecutive paragraphs) based on the flow of content.
+Step 1. First, divide the entire article into approximately {segment_count} segments (meaningful chunks of consecutive paragraphs) based on the flow of content.
 Consider the following points when dividing:
 a) Clear changes in topic or subject matter
 b) Introduction of new concepts or technologies
@@ -122,20 +73,102 @@ Note:
 - The first segment starts with paragraph ID:1, so the segment_start_id of the first segment must be 1. The segment_end_id of one segment and the segment_start_id of the next segment must be consecutive values.
 </instruction>"""
 
-        response = create_message(
+class ContentOrganizer:
+    def __init__(self, config: Config):
+        self.config = config
+        self.project_folder = str(config.project_folder)
+        self.summary_model_id = config.get_config_value("processors.content_organizer.summary.model_id")
+        self.chapters_model_id = config.get_config_value("processors.content_organizer.chapters.model_id")
+
+    async def process(self, contents: Contents) -> Contents:
+        logging.info("Starting content organization")
+        logging.info(f"Source language: {self.config.get_source_language_name()}")
+        logging.info(f"Target language: {self.config.get_target_language_name()}")
+
+        # Extract text content for processing, both as plain text and as paragraph elements
+        text_content = []
+        paragraphs = []
+        for content in contents.get_contents():
+            if content.type == ContentType.TEXT:
+                text = str(content.value)
+                text_content.append(text)
+                paragraphs.append(f"<paragraph id=\"{len(paragraphs) + 1}\">\n{text}\n</paragraph>")
+
+        # Generate summary and chapters concurrently, they are independent of each other
+        summary, chapters = await asyncio.gather(
+            self._generate_summary("\n".join(text_content)),
+            self._generate_chapters("\n".join(paragraphs), len(paragraphs))
+        )
+        contents.add_summary(summary)
+
+        for chapter in chapters:
+            contents.add_chapter(chapter["title"], chapter["segment_start_id"] - 1, chapter["segment_end_id"] - 1)
+
+        logging.info("Content organization completed successfully")
+        return contents
+
+    async def _generate_summary(self, content: str) -> str:
+        target_lang = self.config.get_target_language_name()
+
+        # Calculate target length based on language ratios
+        source_ratio = get_character_ratio(self.config.source_language or "en")
+        target_ratio = get_character_ratio(self.config.target_language)
+        target_length = int(300 * (source_ratio / target_ratio))
+
+        prompt = SUMMARY_PROMPT.format(content=content, target_length=target_length, target_lang=target_lang)
+
+        response = await acreate_message(
             messages=[{"role": "user", "content": prompt}],
             temperature=0.2,
             max_tokens=4000,
             stop_sequences=[],
-            model_id=self.chapters_model_id
+            model_id=self.summary_model_id,
+            validate=lambda response: RESULT_PATTERN.search(response) is not None
         )
 
+        match = RESULT_PATTERN.search(response)
+        if match is None:
+            raise ValueError("No <result> tag found in the summary response")
+        result = match.group(1).strip()
+        logging.debug(f"Generated summary: {result}")
+        return result
+
+    async def _generate_chapters(self, formatted_contents: str, paragraph_count: int) -> list[dict]:
+        target_lang = self.config.get_target_language_name()
+
+        prompt = CHAPTERS_PROMPT.format(
+            formatted_contents=formatted_contents,
+            segment_count=paragraph_count // 8,
+            target_lang=target_lang
+        )
+
+        response = await acreate_message(
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            max_tokens=4000,
+            stop_sequences=[],
+            model_id=self.chapters_model_id,
+            validate=lambda response: RESULT_PATTERN.search(response) is not None
+        )
+
+        match = RESULT_PATTERN.search(response)
+        if match is None:
+            raise ValueError("No <result> tag found in the chapters response")
+        result = match.group(1).strip()
         try:
-            import json
-            result = response.split("<result>")[1].split("</result>")[0].strip()
-            chapters = json.loads(result)
+            chapters = self._parse_chapters(result)
             logging.debug(f"Generated chapters: {chapters}")
             return chapters
         except json.JSONDecodeError:
             logging.error("Failed to parse chapter information")
-            return [] 
\ No newline at end of file
+            return []
+
+    def _parse_chapters(self, result: str) -> list[dict]:
+        try:
+            return json.loads(result)
+        except json.JSONDecodeError:
+            # Salvage common formatting slips of the model (code fences, trailing commas) before giving up
+            cleaned = CODE_FENCE_PATTERN.sub('', result)
+            cleaned = TRAILING_COMMA_PATTERN.sub(r'\1', cleaned)
+            logging.warning("Chapter information is not valid JSON, retrying after cleanup")
+            return json.loads(cleaned) 
\ No newline at end of file
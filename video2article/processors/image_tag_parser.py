@@ -3,6 +3,8 @@ from typing import List
 from video2article.utils.types import Contents, ContentType, ImageContent, TextContent
 from video2article.utils.config import Config
 
+IMAGE_TAG_PATTERN = re.compile(r'<image>(\d+)</image>')
+
 
 class ImageTagParser:
     def __init__(self, config: Config) -> None:
@@ -11,20 +13,25 @@ class ImageTagParser:
 
     def process(self, contents: Contents) -> Contents:
         new_contents = Contents()
-        image_tag_pattern = re.compile(r'<image>(\d+)</image>')
 
         for content in contents.get_contents():
             if content.type == ContentType.TEXT:
                 text = content.value
                 if not isinstance(text, str):
                     continue
-                matches = image_tag_pattern.findall(text)
-
-                for image_id in matches:
-                    new_contents.add_content(ImageContent(type=ContentType.IMAGE, value=int(image_id)))
 
-                cleaned_text = image_tag_pattern.sub('', text)
-                new_contents.add_content(TextContent(type=ContentType.TEXT, value=cleaned_text))
+                # Images are added before the text they appear in, so that each text stays a single paragraph
+                # and the chapter indices keep counting paragraphs. The tags are removed in the same pass.
+                text_parts = []
+                last_end = 0
+                for match in IMAGE_TAG_PATTERN.finditer(text):
+                    text_parts.append(text[last_end:match.start()])
+                    new_contents.add_content(ImageContent(type=ContentType.IMAGE, value=int(match.group(1))))
+                    last_end = match.end()
+                if last_end:
+                    text_parts.append(text[last_end:])
+                    text = "".join(text_parts)
+                new_contents.add_content(TextContent(type=ContentType.TEXT, value=text))
             else:
                 new_contents.add_content(content)
 
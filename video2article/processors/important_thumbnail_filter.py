@@ -2,13 +2,41 @@ import base64
 import logging
 import os
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 
 import cv2
 import numpy as np
 from video2article.utils.bedrock import create_message
 from video2article.utils.types import Contents, ContentType, ImageContent, TextContent
 from video2article.utils.config import Config
+from video2article.utils.pool import get_executor
+
+# Maximum number of images compared with the last kept image in a single vectorized call
+MAX_COMPARISON_BLOCK_SIZE = 16
+# Number of thumbnails loaded ahead of the comparison at a time
+PREFETCH_WINDOW_SIZE = 32
+
+IDS_PATTERN = re.compile(r'<ids>(.*?)</ids>')
+THINKING_PATTERN = re.compile(r'<thinking>(.*?)</thinking>', re.DOTALL)
+
+ML_FILTER_SYSTEM_PROMPT = "You are an AI assistant tasked with analyzing a series of images extracted from a presentation video. I will provide you with pairs of Image IDs and corresponding images. Please ensure you correctly understand the relationship between each ID and its associated image."
+
+ML_FILTER_PROMPT = """You are an AI assistant tasked with analyzing a series of images extracted from a presentation video. I attached the images above with image IDs using "Image [ID]:" format. Image IDs indicate the timestamps of extracted image frames from the video. The images are provided in chronological order based on these timestamps.
+Your task is to review these images and eliminate "unnecessary" images only based on the following criteria:
+<criteria>
+1. Eliminate images if presentation content (text or visuals on the presentation slides) remains unchanged at all from the previous chronologically retained image. Disregard all other changes, including presenter's dynamic movements, gestures, and expressions changes, and live transcription updates on the video, which may appear at the top of slides or bottom of the video. Focus solely on presentation content changes.
+2. Images should be eliminated if they lack meaningful presentation content, including: blank screens, shots showing only the presenter or panelist without any slide content, frames missing both presenter and slides, or any images with significant visual degradation that makes content difficult to comprehend.
+3. Images where text or visuals from different slides are visible should be eliminated.
+4. If an image meets the criteria to be kept based on conditions 1-3, but the next image by timestamp shows either identical content with better visibility (e.g., clearer view, larger slide display, sharper image quality) or the same content plus progressive slide animations (e.g., additional bullet points, new diagram components), eliminate the current image and keep the next one instead.
+</criteria>
+
+Follow these steps of instructions:
+<instructions>
+1. Analyze each image attached above very carefully, and determine if it should be kept or eliminated considering all the criteria. Please be extremely careful not to mismatch images and image IDs.
+2. Document your careful thought process for each image in one <thinking> tag. Explain your decision to keep or eliminate the image.
+3. After analyzing all images, create a final list of the IDs of unnecessary images that should be removed.
+4. Output the final list of unnecessary image IDs in <ids> tags, separated by commas. For example: <ids>2,4,6,8,9</ids> or <ids></ids>
+</instructions>"""
 
 class ImportantThumbnailFilter:
     def __init__(self, config: Config):
@@ -17,7 +45,11 @@ class ImportantThumbnailFilter:
         self.ml_filter_max_workers = config.get_config_value("processors.important_thumbnail_filter.filter_thumbnails_by_ml.max_workers")
         self.ml_filter_batch_size = config.get_config_value("processors.important_thumbnail_filter.filter_thumbnails_by_ml.batch_size")
         self.ml_filter_model_id = config.get_config_value("processors.important_thumbnail_filter.filter_thumbnails_by_ml.model_id")
+        self.ml_filter_max_image_size = config.get_config_value("processors.important_thumbnail_filter.filter_thumbnails_by_ml.max_image_size")
+        self.ml_filter_min_thumbnails = config.get_config_value("processors.important_thumbnail_filter.filter_thumbnails_by_ml.min_thumbnails")
         self.image_filter_change_threshold = config.get_config_value("processors.important_thumbnail_filter.filter_thumbnails_by_image_change.change_threshold")
+        # Base64-encoded thumbnails, shared by the overlapping ML batches
+        self._base64_cache: dict[int, str] = {}
 
     def process(self, thumbnail_ids: list[int]) -> list[int]:
         logging.info("Filtering important thumbnails")
@@ -27,9 +59,12 @@ class ImportantThumbnailFilter:
         remaining_ids = self._filter_thumbnails_by_image_change(thumbnail_ids)
         logging.info(f"Kept {len(remaining_ids)} thumbnails based on classical image-processing filtering")
 
-        # Perform ml-based filtering
-        remaining_ids = self._filter_thumbnails_by_ml(remaining_ids)
-        logging.info(f"Kept {len(remaining_ids)} thumbnails based on ML-base filtering")
+        # Perform ml-based filtering, unless so few thumbnails are left that it is not worth a request
+        if len(remaining_ids) <= self.ml_filter_min_thumbnails:
+            logging.info(f"Skipping ML-based filtering as only {len(remaining_ids)} thumbnails are left")
+        else:
+            remaining_ids = self._filter_thumbnails_by_ml(remaining_ids)
+            logging.info(f"Kept {len(remaining_ids)} thumbnails based on ML-base filtering")
 
         logging.debug(f"Remaining thumbnail ids: {remaining_ids}")
         return remaining_ids
@@ -38,40 +73,81 @@ class ImportantThumbnailFilter:
         """Filter thumbnails based on significant changes in image content."""
         remaining_ids = [thumbnail_ids[0]]  # Always keep the first image
         last_kept_img = self._load_and_preprocess_image(thumbnail_ids[0])
+        if last_kept_img is None:
+            raise ValueError(f"Could not read image for thumbnail {thumbnail_ids[0]}")
 
-        for current_id in thumbnail_ids[1:]:
-            current_img = self._load_and_preprocess_image(current_id)
+        # Decoding and blurring release the GIL, so the images are loaded in parallel. The next window is loaded
+        # while the current one is compared, so at most two windows of images are held in memory.
+        executor = get_executor("thumbnail_loader", os.cpu_count())
+        next_window = self._submit_window(executor, thumbnail_ids, 1)
+        block_size = 1
+        for start in range(1, len(thumbnail_ids), PREFETCH_WINDOW_SIZE):
+            window = next_window
+            next_window = self._submit_window(executor, thumbnail_ids, start + PREFETCH_WINDOW_SIZE)
+            window_ids, images = self._collect_window(window, last_kept_img.shape)
 
-            if current_img is None:
-                logging.warning(f"Could not read image for thumbnail {current_id}")
-                continue
+            # Compare the following images with the last kept image in blocks. The block grows while nothing
+            # changes, so static stretches take a few vectorized calls, and shrinks back to one image after
+            # each kept image.
+            current_index = 0
+            while current_index < len(window_ids):
+                change_ratios = self._calculate_image_change_ratios(
+                    last_kept_img, images[current_index:current_index + block_size])
+                changed = np.flatnonzero(change_ratios >= self.image_filter_change_threshold)
+                skipped_count = int(changed[0]) if changed.size else len(change_ratios)
 
-            # Calculate the change ratio between the last kept image and the current image
-            change_ratio = self._calculate_image_change_ratio(last_kept_img, current_img)
+                for offset in range(skipped_count):
+                    logging.debug(f"Skipped thumbnail {window_ids[current_index + offset]}. Change ratio: {change_ratios[offset]:.4f}")
 
-            if change_ratio >= self.image_filter_change_threshold:
-                remaining_ids.append(current_id)
-                last_kept_img = current_img
-                logging.debug(f"Kept thumbnail {current_id}. Change ratio: {change_ratio:.4f}")
-            else:
-                logging.debug(f"Skipped thumbnail {current_id}. Change ratio: {change_ratio:.4f}")
+                if changed.size:
+                    kept_index = current_index + skipped_count
+                    remaining_ids.append(window_ids[kept_index])
+                    logging.debug(f"Kept thumbnail {window_ids[kept_index]}. Change ratio: {change_ratios[skipped_count]:.4f}")
+                    # Copy so that the window can be released once it has been compared
+                    last_kept_img = images[kept_index].copy()
+                    current_index = kept_index + 1
+                    block_size = 1
+                else:
+                    current_index += skipped_count
+                    block_size = min(block_size * 2, MAX_COMPARISON_BLOCK_SIZE)
 
         return remaining_ids
 
+    def _submit_window(self, executor: ThreadPoolExecutor, thumbnail_ids: list[int], start: int) -> list[tuple[int, Future]]:
+        """Submit the loading of a window of thumbnails starting at the given index."""
+        return [
+            (image_id, executor.submit(self._load_and_preprocess_image, image_id))
+            for image_id in thumbnail_ids[start:start + PREFETCH_WINDOW_SIZE]
+        ]
+
+    def _collect_window(self, window: list[tuple[int, Future]], shape: tuple[int, ...]) -> tuple[list[int], np.ndarray]:
+        """Wait for a window of thumbnails and stack the loaded ones into a single (N, H, W) array."""
+        window_ids: list[int] = []
+        images = np.empty((len(window), *shape), dtype=np.uint8)
+        for image_id, future in window:
+            img = future.result()
+            if img is None or img.shape != shape:
+                logging.warning(f"Could not read image for thumbnail {image_id}")
+                continue
+            images[len(window_ids)] = img
+            window_ids.append(image_id)
+        return window_ids, images[:len(window_ids)]
+
     def _load_and_preprocess_image(self, image_id: int):
         """Load an image and preprocess it for comparison."""
         img_path = f"{self.project_folder}/thumbnails/thumbnail_{image_id}.jpg"
-        img = cv2.imread(img_path)
+        # Decode straight to grayscale, which skips the chroma decoding and the color conversion
+        img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
         if img is not None:
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            img = cv2.GaussianBlur(img, (11, 11), 0)
+            # A 7x7 box filter has about the same variance as the 11x11 Gaussian kernel (sigma 2) at a fraction of the cost
+            img = cv2.boxFilter(img, -1, (7, 7))
         return img
 
-    def _calculate_image_change_ratio(self, img1, img2):
-        """Calculate the ratio of change between two images."""
-        diff = cv2.absdiff(img1, img2)
-        _, thresh = cv2.threshold(diff, 10, 255, cv2.THRESH_BINARY)
-        return np.sum(thresh) / (thresh.shape[0] * thresh.shape[1] * 255)
+    def _calculate_image_change_ratios(self, reference: np.ndarray, images: np.ndarray) -> np.ndarray:
+        """Calculate the ratio of pixels whose intensity differs by more than 10 from the reference, for each image."""
+        # Absolute difference of uint8 images without overflow
+        diff = np.maximum(images, reference) - np.minimum(images, reference)
+        return np.count_nonzero(diff > 10, axis=(1, 2)) / reference.size
 
     def _filter_thumbnails_by_ml(self, thumbnail_ids: list[int]) -> list[int]:
         n = len(thumbnail_ids)
@@ -80,27 +156,55 @@ class ImportantThumbnailFilter:
         eliminated_ids = set()
         logging.info(f"Processing {n} thumbnails in {total_batches} batches with {self.ml_filter_max_workers} parallel workers")
 
-        with ThreadPoolExecutor(max_workers=self.ml_filter_max_workers) as executor:
-            future_to_batch = {}
-            for i in range(0, n - 1, self.ml_filter_batch_size - overlap):
-                end = min(i + self.ml_filter_batch_size, n)
-                batch = thumbnail_ids[i:end]
-                logging.debug(f"Submitting batch: thumbnail_ids {batch}")
-                future = executor.submit(self._remove_unnecessary_thumbnails_in_batch, batch)
-                future_to_batch[future] = batch
-
-            for future in as_completed(future_to_batch):
-                batch = future_to_batch[future]
-                try:
-                    ids_to_eliminate = future.result()
-                    eliminated_ids.update(ids_to_eliminate)
-                except Exception as e:
-                    logging.error(f"Batch {batch} generated an exception: {e}")
-                    raise e
+        executor = get_executor("important_thumbnail_filter", self.ml_filter_max_workers)
+        future_to_batch = {}
+        for i in range(0, n - 1, self.ml_filter_batch_size - overlap):
+            end = min(i + self.ml_filter_batch_size, n)
+            batch = thumbnail_ids[i:end]
+            logging.debug(f"Submitting batch: thumbnail_ids {batch}")
+            future = executor.submit(self._remove_unnecessary_thumbnails_in_batch, batch)
+            future_to_batch[future] = batch
+
+        for future in as_completed(future_to_batch):
+            batch = future_to_batch[future]
+            try:
+                ids_to_eliminate = future.result()
+                eliminated_ids.update(ids_to_eliminate)
+            except Exception as e:
+                logging.error(f"Batch {batch} generated an exception: {e}")
+                raise e
+
+        self._base64_cache.clear()
 
         remaining_ids = sorted(set(thumbnail_ids) - eliminated_ids)
         return remaining_ids
 
+    def _load_base64_image(self, image_id: int) -> str:
+        """Load a thumbnail as a base64 string, reading and encoding each thumbnail only once."""
+        base64_image = self._base64_cache.get(image_id)
+        if base64_image is None:
+            base64_image = base64.b64encode(self._load_downscaled_image(image_id)).decode("utf-8")
+            self._base64_cache[image_id] = base64_image
+        return base64_image
+
+    def _load_downscaled_image(self, image_id: int) -> bytes:
+        """Load a thumbnail as JPEG bytes whose longer edge does not exceed the configured maximum size."""
+        img_path = f"{self.project_folder}/thumbnails/thumbnail_{image_id}.jpg"
+        img = cv2.imread(img_path)
+        if img is None:
+            raise ValueError(f"Could not read image for thumbnail {image_id}")
+
+        height, width = img.shape[:2]
+        scale = self.ml_filter_max_image_size / max(height, width)
+        if scale >= 1:
+            # Small enough already, send the original file without re-encoding
+            with open(img_path, mode="rb") as f:
+                return f.read()
+
+        img = cv2.resize(img, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        return buffer.tobytes()
+
     def _remove_unnecessary_thumbnails_in_batch(self, batch):
         ids = []
         messages: list[dict[str, any]] = [
@@ -110,8 +214,7 @@ class ImportantThumbnailFilter:
             }
         ]
         for image_id in batch:
-            with open(f"{self.project_folder}/thumbnails/thumbnail_{image_id}.jpg", mode="rb") as f:
-                base64_image = base64.b64encode(f.read()).decode("utf-8")
+            base64_image = self._load_base64_image(image_id)
 
             messages[0]["content"].append({
                 "type": "text",
@@ -127,38 +230,24 @@ class ImportantThumbnailFilter:
                 }
             })
 
-        prompt = """You are an AI assistant tasked with analyzing a series of images extracted from a presentation video. I attached the images above with image IDs using "Image [ID]:" format. Image IDs indicate the timestamps of extracted image frames from the video. The images are provided in chronological order based on these timestamps.
-Your task is to review these images and eliminate "unnecessary" images only based on the following criteria:
-<criteria>
-1. Eliminate images if presentation content (text or visuals on the presentation slides) remains unchanged at all from the previous chronologically retained image. Disregard all other changes, including presenter's dynamic movements, gestures, and expressions changes, and live transcription updates on the video, which may appear at the top of slides or bottom of the video. Focus solely on presentation content changes.
-2. Images should be eliminated if they lack meaningful presentation content, including: blank screens, shots showing only the presenter or panelist without any slide content, frames missing both presenter and slides, or any images with significant visual degradation that makes content difficult to comprehend.
-3. Images where text or visuals from different slides are visible should be eliminated.
-4. If an image meets the criteria to be kept based on conditions 1-3, but the next image by timestamp shows either identical content with better visibility (e.g., clearer view, larger slide display, sharper image quality) or the same content plus progressive slide animations (e.g., additional bullet points, new diagram components), eliminate the current image and keep the next one instead.
-</criteria>
-
-Follow these steps of instructions:
-<instructions>
-1. Analyze each image attached above very carefully, and determine if it should be kept or eliminated considering all the criteria. Please be extremely careful not to mismatch images and image IDs.
-2. Document your careful thought process for each image in one <thinking> tag. Explain your decision to keep or eliminate the image.
-3. After analyzing all images, create a final list of the IDs of unnecessary images that should be removed.
-4. Output the final list of unnecessary image IDs in <ids> tags, separated by commas. For example: <ids>2,4,6,8,9</ids> or <ids></ids>
-</instructions>"""
-
         messages[0]["content"].append({
             "type": "text",
-            "text": prompt
+            "text": ML_FILTER_PROMPT
         })
 
         message = create_message(
                 messages=messages,
-                system="You are an AI assistant tasked with analyzing a series of images extracted from a presentation video. I will provide you with pairs of Image IDs and corresponding images. Please ensure you correctly understand the relationship between each ID and its associated image.",
+                system=ML_FILTER_SYSTEM_PROMPT,
                 temperature=0,
                 max_tokens=4000,
-                model_id=self.ml_filter_model_id)
+                model_id=self.ml_filter_model_id,
+                validate=lambda response: THINKING_PATTERN.search(response) is not None)
 
-        match = re.search(r'<ids>(.*?)</ids>', message)
-        thinking = message.split('<thinking>')[1].split('</thinking>')[0].strip()
-        logging.debug(f"_remove_unnecessary_thumbnails_in_batch(), Thinking: {thinking}")
+        match = IDS_PATTERN.search(message)
+        thinking = THINKING_PATTERN.search(message)
+        if thinking is None:
+            raise ValueError("No <thinking> tag found in the thumbnail filter response")
+        logging.debug(f"_remove_unnecessary_thumbnails_in_batch(), Thinking: {thinking.group(1).strip()}")
         if match:
             ids = [int(id) for id in match.group(1).split(',') if id]
         else:
@@ -1,52 +1,106 @@
 import base64
 import logging
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import re
+from concurrent.futures import as_completed
 
 from video2article.utils.bedrock import create_message
 from video2article.utils.types import Contents, ContentType, ImageContent, TextContent
 from video2article.utils.config import Config
-from video2article.utils.utils import (
-    get_id_from_thumbnail_path,
-    get_path_from_thumbnail_id,
-)
+from video2article.utils.pool import get_executor
+from video2article.utils.utils import get_path_from_thumbnail_id
+
+THUMBNAIL_TEXT_PATTERN = re.compile(r'<text id="(\d+)">(.*?)</text>', re.DOTALL)
 
 class ThumbnailContentExtractor:
     def __init__(self, config: Config):
         self.config = config
         self.project_folder = str(config.project_folder)
         self.thumbnail_max_workers = config.get_config_value("processors.thumbnail_content_extractor.extract_thumbnail_contents.max_workers")
+        self.thumbnail_batch_size = config.get_config_value("processors.thumbnail_content_extractor.extract_thumbnail_contents.batch_size")
         self.thumbnail_extract_model_id = config.get_config_value("processors.thumbnail_content_extractor.extract_thumbnail_contents.model_id")
         self.thumbnail_keywords_model_id = config.get_config_value("processors.thumbnail_content_extractor.extract_keywords.model_id")
 
     def process(self, thumbnail_ids:list[int]) -> tuple[dict[int, str], str]:
         logging.info("Extracting thumbnail contents")
-        logging.info(f"Processing {len(thumbnail_ids)} thumbnails with {self.thumbnail_max_workers} parallel workers")
-
-        thumbnail_contents = {}
-        with ThreadPoolExecutor(max_workers=self.thumbnail_max_workers) as executor:
-            future_to_id = {executor.submit(self._process_single_thumbnail, id): id for id in thumbnail_ids}
-            for future in as_completed(future_to_id):
-                id = future_to_id[future]
-                try:
-                    content = future.result()
-                    thumbnail_contents[id] = content
-                    logging.debug(f"Processed thumbnail: {id}")
-                except Exception as e:
-                    logging.error(f"Error extracting thumbnail content for id {id}: {str(e)}")
-                    raise
-
-        thumbnail_contents = dict(sorted(thumbnail_contents.items()))
+        batches = [thumbnail_ids[i:i + self.thumbnail_batch_size] for i in range(0, len(thumbnail_ids), self.thumbnail_batch_size)]
+        logging.info(f"Processing {len(thumbnail_ids)} thumbnails in {len(batches)} batches with {self.thumbnail_max_workers} parallel workers")
+
+        extracted_contents = {}
+        executor = get_executor("thumbnail_content_extractor", self.thumbnail_max_workers)
+        future_to_batch = {executor.submit(self._process_thumbnail_batch, batch): batch for batch in batches}
+        for future in as_completed(future_to_batch):
+            batch = future_to_batch[future]
+            try:
+                extracted_contents.update(future.result())
+                logging.debug(f"Processed thumbnails: {batch}")
+            except Exception as e:
+                logging.error(f"Error extracting thumbnail content for ids {batch}: {str(e)}")
+                raise
+
+        # The thumbnail IDs are given in chronological order, keep it instead of sorting the results
+        thumbnail_contents = {thumbnail_id: extracted_contents[thumbnail_id] for thumbnail_id in thumbnail_ids}
 
         # Extract keywords
         keywords = self._extract_keywords(thumbnail_contents)
 
         return thumbnail_contents, keywords
 
-    def _process_single_thumbnail(self, thumbnail_id: int) -> str:
+    def _load_base64_image(self, thumbnail_id: int) -> str:
         thumbnail_path = get_path_from_thumbnail_id(self.project_folder, thumbnail_id)
         with open(thumbnail_path, "rb") as image_file:
-            base64_image = base64.b64encode(image_file.read()).decode("utf-8")
+            return base64.b64encode(image_file.read()).decode("utf-8")
+
+    def _process_thumbnail_batch(self, thumbnail_ids: list[int]) -> dict[int, str]:
+        """Transcribe the slides of several thumbnails in a single request."""
+        content: list[dict[str, any]] = []
+        for thumbnail_id in thumbnail_ids:
+            base64_image = self._load_base64_image(thumbnail_id)
+            content.append({"type": "text", "text": f"Image {thumbnail_id}:"})
+            content.append({
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": "image/jpeg",
+                    "data": base64_image
+                }
+            })
+
+        prompt = """These are images taken from specific points in a presentation video. Each image is preceded by its image ID in "Image [ID]:" format.
+For each image, please transcribe all text visible in the presentation slides and output it accurately within a <text> tag with the image ID, e.g. <text id="120">...</text>.
+However, for images where presentation slides are not shown or where slides are significantly cut off making the entire text unclear, please do not include anything within the tag of the image, e.g. <text id="120"></text>.
+When transcribing, please structure the output in Markdown format to clearly convey the slide's organization.
+Output exactly one <text> tag for each image in the order of the images. Do NOT output other than <text> tags."""
+        content.append({"type": "text", "text": prompt})
+
+        system = "You are a highly capable AI designed to accurately extract information from images."
+
+        # A response cut off by the output limit misses the last images, so it is not kept in the response cache
+        response = create_message(
+            messages=[{"role": "user", "content": content}],
+            system=system,
+            temperature=0,
+            max_tokens=4000,
+            stop_sequences=[],
+            model_id=self.thumbnail_extract_model_id,
+            validate=lambda response: {int(thumbnail_id) for thumbnail_id, _ in THUMBNAIL_TEXT_PATTERN.findall(response)} >= set(thumbnail_ids)
+        )
+
+        texts = {int(thumbnail_id): text for thumbnail_id, text in THUMBNAIL_TEXT_PATTERN.findall(response)}
+        thumbnail_contents = {}
+        for thumbnail_id in thumbnail_ids:
+            if thumbnail_id in texts:
+                # Keep the <text> tag of the single-image responses, the contents are passed to the prompts as they are
+                thumbnail_contents[thumbnail_id] = f"<text>{texts[thumbnail_id]}</text>"
+            else:
+                # Dense slides can exhaust the output limit shared by the batch, so the missing ones get their own request
+                logging.warning(f"No text was extracted for thumbnail {thumbnail_id} in its batch, transcribing it alone")
+                thumbnail_contents[thumbnail_id] = self._process_single_thumbnail(thumbnail_id)
+        return thumbnail_contents
+
+    def _process_single_thumbnail(self, thumbnail_id: int) -> str:
+        """Transcribe the slide of a single thumbnail."""
+        base64_image = self._load_base64_image(thumbnail_id)
 
         prompt = """This is an image taken from specific points in a presentation video. 
 Please transcribe all text visible in the presentation slides and output within <text> tags accurately.
@@ -84,8 +138,6 @@ Do NOT output more than one <text> tag. Do NOT output other than <text> tag."""
             stop_sequences=[],
             model_id=self.thumbnail_extract_model_id
         )
-
-        thumbnail_id = get_id_from_thumbnail_path(thumbnail_path)
         return response
 
     def _extract_keywords(self, thumbnail_contents: dict[int, str]) -> str:
@@ -1,8 +1,9 @@
 import logging
 import os
 import re
-from concurrent.futures import ThreadPoolExecutor
-from typing import Tuple
+from bisect import bisect_left, bisect_right
+from concurrent.futures import as_completed
+from typing import Optional, Tuple
 
 from video2article.utils.bedrock import create_message
 from video2article.utils.constants import (
@@ -12,8 +13,24 @@ from video2article.utils.constants import (
 )
 from video2article.utils.types import Contents, ContentType, ImageContent, TextContent
 from video2article.utils.config import Config
+from video2article.utils.language import SENTENCE_ENDINGS
+from video2article.utils.pool import get_executor
 from webvtt import WebVTT
 
+IMAGE_TAG_PATTERN = re.compile(r'<image>(\d+)</image>')
+# Closing quotes and brackets may follow the punctuation that ends a sentence
+SENTENCE_END_SUFFIX = r'["\'\)\]”’」』]*$'
+RESULT_PATTERN = re.compile(r'<result>(.*?)</result>', re.DOTALL)
+THINKING_PATTERN = re.compile(r'<thinking>(.*?)</thinking>', re.DOTALL)
+# The paragraphs must not cross a </pair>, so that a malformed pair cannot swallow the next one
+PAIR_PATTERN = re.compile(
+    r'<pair id=(\d+)>\s*'
+    r'<paragraph id=1>((?:(?!</pair>).)*?)</paragraph>\s*'
+    r'<paragraph id=2>((?:(?!</pair>).)*?)</paragraph>\s*</pair>',
+    re.DOTALL
+)
+PARAGRAPHS_PATTERN = re.compile(r'<paragraph id=1>(.*?)</paragraph>\s*<paragraph id=2>(.*?)</paragraph>', re.DOTALL)
+
 class TranscriptRevisor:
 
     def __init__(self, config: Config):
@@ -21,6 +38,7 @@ class TranscriptRevisor:
         self.project_folder = str(config.project_folder)
         self.revise_max_workers = config.get_config_value("processors.transcript_revisor.revise.max_workers")
         self.fix_boundary_max_workers = config.get_config_value("processors.transcript_revisor.fix_paragraph_boundary.max_workers")
+        self.fix_boundary_batch_size = config.get_config_value("processors.transcript_revisor.fix_paragraph_boundary.batch_size")
         self.revise_model_id = config.get_config_value("processors.transcript_revisor.revise.model_id")
         self.fix_boundary_model_id = config.get_config_value("processors.transcript_revisor.fix_paragraph_boundary.model_id")
 
@@ -28,44 +46,73 @@ class TranscriptRevisor:
         logging.info("Starting transcript revision")
 
         # Revise segments
-        segments = self._segment_transcript(captions, thumbnail_contents)
+        sorted_thumbnail_ids = sorted(thumbnail_contents)
+        # Convert the caption times once, they are used by the segmentation and the boundary checks
+        caption_starts = [self._convert_time_to_seconds(caption.start) for caption in captions]
+        caption_ends = [self._convert_time_to_seconds(caption.end) for caption in captions]
+        segments = self._segment_transcript(captions, caption_starts, caption_ends, sorted_thumbnail_ids)
         total_segments = len(segments)
+        thumbnail_contexts = [
+            self._get_relevant_thumbnail_context(i, thumbnail_contents, sorted_thumbnail_ids)
+            for i in range(total_segments)
+        ]
         logging.info(f"Processing {total_segments} segments with {self.revise_max_workers} parallel workers")
+        logging.info(f"Fixing {total_segments - 1} boundaries between segments in batches of {self.fix_boundary_batch_size} with {self.fix_boundary_max_workers} parallel workers")
+        # Paragraphs of each revised segment, split once and shared by the boundary fixes and the final stitching
+        revised_paragraphs: list[Optional[list[str]]] = [None] * total_segments
+        fixed_boundaries: list[Optional[list[str]]] = [None] * (total_segments - 1)
+        # A boundary without captions in the overlap between the segments has no duplicated speech, so it only
+        # needs a fix when a sentence is cut off there
+        overlapping_boundaries = self._get_overlapping_boundaries(caption_starts, total_segments - 1)
+        sentence_ending = re.compile(SENTENCE_ENDINGS.get(self.config.source_language or "en", r'[.!?]') + SENTENCE_END_SUFFIX)
+        skipped_boundaries = 0
+
+        # Each boundary is queued as soon as the segments on both sides are revised, and the queued boundaries are
+        # fixed in batches while the other segments are still being revised
+        revise_executor = get_executor("transcript_revisor", self.revise_max_workers)
+        fix_executor = get_executor("paragraph_boundary_fixer", self.fix_boundary_max_workers)
+        fix_futures = {}
+
+        def submit_boundaries(boundaries: list[int]) -> None:
+            pairs = [(revised_paragraphs[boundary][-1], revised_paragraphs[boundary + 1][0]) for boundary in boundaries]
+            fix_futures[fix_executor.submit(self._fix_paragraph_boundaries, pairs)] = boundaries
+
+        revise_futures = {
+            revise_executor.submit(self._revise_single_segment, i, segment, thumbnail_contexts[i], keywords): i
+            for i, segment in enumerate(segments)
+        }
+        pending_boundaries: list[int] = []
+        for future in as_completed(revise_futures):
+            i = revise_futures[future]
+            revised_paragraphs[i] = future.result().split('\n\n')
+            for boundary in (i - 1, i):
+                if 0 <= boundary < total_segments - 1 and revised_paragraphs[boundary] is not None and revised_paragraphs[boundary + 1] is not None:
+                    prev_paragraph, next_paragraph = revised_paragraphs[boundary][-1], revised_paragraphs[boundary + 1][0]
+                    if not overlapping_boundaries[boundary] and self._is_clean_boundary(prev_paragraph, next_paragraph, sentence_ending):
+                        fixed_boundaries[boundary] = [prev_paragraph, next_paragraph]
+                        skipped_boundaries += 1
+                    else:
+                        pending_boundaries.append(boundary)
+            while len(pending_boundaries) >= self.fix_boundary_batch_size:
+                submit_boundaries(pending_boundaries[:self.fix_boundary_batch_size])
+                pending_boundaries = pending_boundaries[self.fix_boundary_batch_size:]
+        if pending_boundaries:
+            submit_boundaries(pending_boundaries)
+        logging.info(f"Skipped {skipped_boundaries} clean boundaries out of {total_segments - 1}")
+
+        for future in as_completed(fix_futures):
+            for boundary, fixed_boundary in zip(fix_futures[future], future.result()):
+                fixed_boundaries[boundary] = fixed_boundary
+
+        logging.debug(f"Revised segments: {revised_paragraphs}")
 
-        with ThreadPoolExecutor(max_workers=self.revise_max_workers) as executor:
-            revised_segments = list(executor.map(
-                self._revise_single_segment,
-                range(len(segments)),
-                segments,
-                [thumbnail_contents] * len(segments),
-                [keywords] * len(segments)
-            ))
-
-        logging.debug(f"Revised segments: {revised_segments}")
-
-        # Fix boundaries between segments
-        logging.info("Fixing boundeies between segments")
         final_paragraphs = []
-
-        first_segment_paragraphs = revised_segments[0].split('\n\n')
-        final_paragraphs.extend(first_segment_paragraphs)
-
-        boundary_tasks = []
-        for i in range(1, len(revised_segments)):
-            prev_paragraph = revised_segments[i-1].split('\n\n')[-1]
-            current_paragraph = revised_segments[i].split('\n\n')[0]
-            boundary_tasks.append((prev_paragraph, current_paragraph))
-
-        with ThreadPoolExecutor(max_workers=self.fix_boundary_max_workers) as executor:
-            fixed_boundaries = list(executor.map(
-                lambda x: self._fix_paragraph_boundary(x[0], x[1]),
-                boundary_tasks
-            ))
+        final_paragraphs.extend(revised_paragraphs[0])
 
         for i, (fixed_prev, fixed_current) in enumerate(fixed_boundaries, 1):
             final_paragraphs[-1] = fixed_prev
-            current_segment_paragraphs = revised_segments[i].split('\n\n')
-            final_paragraphs.extend([fixed_current] + current_segment_paragraphs[1:])
+            final_paragraphs.append(fixed_current)
+            final_paragraphs.extend(revised_paragraphs[i][1:])
 
         revised_text = "\n\n".join(final_paragraphs)
         logging.debug(f"Boundary fixed revised text: {revised_text}")
@@ -79,12 +126,8 @@ class TranscriptRevisor:
         contents = Contents([TextContent(type=ContentType.TEXT, value=paragraph) for paragraph in paragraphs])
         return contents
 
-    def _revise_single_segment(self, i, segment, thumbnail_contents, keywords):
+    def _revise_single_segment(self, i, segment, relevant_thumbnail_context, keywords):
         logging.info(f"Segment {i+1}: Starting revision")
-        start_time = max(0, int(SEGMENT_DURATION * (i-0.5)))
-        end_time = int(SEGMENT_DURATION * (i+1+0.2))
-        relevant_thumbnail_context = self._get_relevant_thumbnail_context(thumbnail_contents, start_time, end_time)
-        logging.debug(f"Segment {i+1}: Using thumbnail from {start_time} to {end_time}.")
         revised_segment = self._revise_segment(segment, relevant_thumbnail_context, keywords)
         logging.info(f"Segment {i+1}: Completed revision")
         return revised_segment
@@ -94,62 +137,66 @@ class TranscriptRevisor:
         seconds, milliseconds = seconds.split(".")
         return int(hours) * 3600 + int(minutes) * 60 + int(seconds) + int(milliseconds) / 1000
 
-    def _segment_transcript(self, captions, thumbnail_contents: dict[int, str]) -> list[str]:
+    def _segment_transcript(self, captions, caption_starts: list[float], caption_ends: list[float], sorted_thumbnail_ids: list[int]) -> list[str]:
         transcript_segments: list[str] = []
-        transcript = ""
+        # Parts of the current segment, joined once when the segment is complete
+        transcript_parts: list[str] = []
         start_time = 0
         thumbnail_index = 0
-        sorted_thumbnail_ids = sorted(thumbnail_contents.keys())
-        total_duration = self._convert_time_to_seconds(captions[-1].end)
+        # Captions are in chronological order, so the captions starting within a segment are a contiguous slice
+        # that can be found by bisection
+        total_duration = caption_ends[-1]
 
         debug_log = ["Transcript Segmentation Debug Log:"]
         debug_log.append(f"Total duration: {total_duration:.2f}s, Total thumbnails: {len(sorted_thumbnail_ids)}")
 
         # Insert images before the first caption
-        first_caption_start = self._convert_time_to_seconds(captions[0].start)
+        first_caption_start = caption_starts[0]
         while thumbnail_index < len(sorted_thumbnail_ids) and sorted_thumbnail_ids[thumbnail_index] < first_caption_start:
             image_time = sorted_thumbnail_ids[thumbnail_index]
-            transcript += f"<image>{image_time}</image> "
+            transcript_parts.append(f"<image>{image_time}</image> ")
             debug_log.append(f"Inserted pre-caption image: <image>{image_time}</image>")
             thumbnail_index += 1
 
         while start_time < total_duration:
             end_time = start_time + SEGMENT_DURATION
-            segment_log = f"\nSegment {len(transcript_segments) + 1}: {start_time:.2f}s - {(end_time+OVERLAP_TIME):.2f}s"
-
-            for caption in captions:
-                caption_start = self._convert_time_to_seconds(caption.start)
-                caption_end = self._convert_time_to_seconds(caption.end)
-
-                if start_time <= caption_start < (end_time + OVERLAP_TIME):
-                    caption_log = f"  Caption ({caption_start:.2f}s - {caption_end:.2f}s): "
-
-                    # Insert images before and within the caption
-                    while thumbnail_index < len(sorted_thumbnail_ids) and sorted_thumbnail_ids[thumbnail_index] < caption_end:
-                        image_time = sorted_thumbnail_ids[thumbnail_index]
-                        transcript += f"<image>{image_time}</image> "
-                        caption_log += f"<image>{image_time}</image>  "
-                        thumbnail_index += 1
-
-                    c = caption.text.replace('\n', ' ') + " "
-                    transcript += c
-                    caption_log += f"Text: {c}"
-                    segment_log += f"\n{caption_log}"
+            segment_log = [f"\nSegment {len(transcript_segments) + 1}: {start_time:.2f}s - {(end_time+OVERLAP_TIME):.2f}s"]
+
+            first_caption_index = bisect_left(caption_starts, start_time)
+            last_caption_index = bisect_left(caption_starts, end_time + OVERLAP_TIME)
+            for caption_index in range(first_caption_index, last_caption_index):
+                caption = captions[caption_index]
+                caption_start = caption_starts[caption_index]
+                caption_end = caption_ends[caption_index]
+                caption_log = f"  Caption ({caption_start:.2f}s - {caption_end:.2f}s): "
+
+                # Insert images before and within the caption
+                while thumbnail_index < len(sorted_thumbnail_ids) and sorted_thumbnail_ids[thumbnail_index] < caption_end:
+                    image_time = sorted_thumbnail_ids[thumbnail_index]
+                    transcript_parts.append(f"<image>{image_time}</image> ")
+                    caption_log += f"<image>{image_time}</image>  "
+                    thumbnail_index += 1
+
+                c = caption.text.replace('\n', ' ') + " "
+                transcript_parts.append(c)
+                caption_log += f"Text: {c}"
+                segment_log.append(caption_log)
 
             # Merge the last segment if it's too short
             if end_time >= total_duration and len(transcript_segments) > 0:
                 last_segment_duration = total_duration - start_time
                 if last_segment_duration < SEGMENT_DURATION * MIN_SEGMENT_RATIO:
-                    segment_log += f"\nMerging last segment (duration: {last_segment_duration:.2f}s) with previous segment"
-                    transcript_segments[-1] += " " + transcript
+                    segment_log.append(f"Merging last segment (duration: {last_segment_duration:.2f}s) with previous segment")
+                    transcript_segments[-1] += " " + "".join(transcript_parts)
                     break
 
-            debug_log.append(segment_log)
+            debug_log.append("\n".join(segment_log))
 
+            transcript = "".join(transcript_parts)
             logging.debug(f"append transcript: {transcript}")
 
             transcript_segments.append(transcript.strip())
-            transcript = ""
+            transcript_parts.clear()
             start_time = end_time
 
         # Add remaining image tags to the last segment
@@ -168,20 +215,34 @@ class TranscriptRevisor:
         logging.debug("\n".join(debug_log))
         return transcript_segments
 
-    def _get_relevant_thumbnail_context(self, thumbnail_contents: dict[int, str], start_time: int, end_time: int) -> str:
-        prompt = ""
-        for id, content in thumbnail_contents.items():
-            if start_time <= id <= end_time:
-                prompt += f'<slide index="{id}">'
-                prompt += "<content>"
-                prompt += content
-                prompt += "</content>"
-                prompt += "</slide>"
-        return prompt
+    def _get_overlapping_boundaries(self, caption_starts: list[float], boundary_count: int) -> list[bool]:
+        """Check for each segment boundary whether captions start within the overlap shared by both segments."""
+        overlapping_boundaries = []
+        for boundary in range(boundary_count):
+            end_time = (boundary + 1) * SEGMENT_DURATION
+            overlapping_boundaries.append(bisect_left(caption_starts, end_time) < bisect_left(caption_starts, end_time + OVERLAP_TIME))
+        return overlapping_boundaries
+
+    def _is_clean_boundary(self, prev_paragraph: str, next_paragraph: str, sentence_ending: re.Pattern) -> bool:
+        """Check if the previous paragraph ends a sentence and the next one starts a new sentence."""
+        prev_text = IMAGE_TAG_PATTERN.sub('', prev_paragraph).rstrip()
+        next_text = IMAGE_TAG_PATTERN.sub('', next_paragraph).lstrip()
+        return sentence_ending.search(prev_text) is not None and not next_text[:1].islower()
+
+    def _get_relevant_thumbnail_context(self, i: int, thumbnail_contents: dict[int, str], sorted_thumbnail_ids: list[int]) -> str:
+        start_time = max(0, int(SEGMENT_DURATION * (i-0.5)))
+        end_time = int(SEGMENT_DURATION * (i+1+0.2))
+        logging.debug(f"Segment {i+1}: Using thumbnail from {start_time} to {end_time}.")
+        # Thumbnail IDs are timestamps, so the thumbnails within the time window are a contiguous slice
+        first_index = bisect_left(sorted_thumbnail_ids, start_time)
+        last_index = bisect_right(sorted_thumbnail_ids, end_time)
+        return "".join(
+            f'<slide index="{id}"><content>{thumbnail_contents[id]}</content></slide>'
+            for id in sorted_thumbnail_ids[first_index:last_index]
+        )
 
     def _revise_segment(self, segment, relevant_thumbnail_context, keywords):
-        pattern = r'<image>(\d+)</image>'
-        image_ids = set(map(int, re.findall(pattern, segment)))
+        image_ids = set(map(int, IMAGE_TAG_PATTERN.findall(segment)))
 
         prompt = f"""You are tasked with revising a segment of a presentation transcript.
 Below, you will find:
@@ -235,7 +296,7 @@ Then, follow ALL THESE instructions carefully:
         )
 
         # Extract the revised segment from the response
-        revised_segment = response.split("<result>")[-1].split("</result>")[0].strip()
+        revised_segment = response.rpartition("<result>")[2].partition("</result>")[0].strip()
         return revised_segment
 
     def _are_all_image_tags_included(self, thumbnail_contents: dict[int, str], revised_content: str) -> bool:
@@ -243,8 +304,7 @@ Then, follow ALL THESE instructions carefully:
         thumbnail_ids = set(thumbnail_contents.keys())
 
         # Extract all image tag IDs from revised_content
-        pattern = r'<image>(\d+)</image>'
-        content_ids = set(map(int, re.findall(pattern, revised_content)))
+        content_ids = set(map(int, IMAGE_TAG_PATTERN.findall(revised_content)))
 
         # Calculate the differences
         missing_ids = thumbnail_ids - content_ids
@@ -258,7 +318,80 @@ Then, follow ALL THESE instructions carefully:
         # Return True if all IDs match
         return True
 
+    def _fix_paragraph_boundaries(self, boundaries: list[tuple[str, str]]) -> list[list[str]]:
+        """Fix the boundaries between several pairs of paragraphs in a single request."""
+        pairs = "\n".join(
+            f"<pair id={pair_id}>\n<paragraph id=1> {paragraph1} </paragraph>\n<paragraph id=2> {paragraph2} </paragraph>\n</pair>"
+            for pair_id, (paragraph1, paragraph2) in enumerate(boundaries, 1)
+        )
+        prompt = f"""
+The following pairs of paragraphs are transcriptions of spoken content, divided by time segments with some overlap. As a result, there may be unnatural breaks or redundancies at the paragraph boundaries, especially between the last few seconds of the first paragraph and the first few seconds of the second paragraph in each pair.
+Each pair is independent of the other pairs. Please read them carefully and follow the instructions below:
+
+<pairs>
+{pairs}
+</pairs>
+
+<instructions>
+Step 1. Carefully read both paragraphs of each pair, paying special attention to the paragraph boundaries.
+Step 2. Identify overlaps or unnatural breaks at the paragraph boundaries. Then, eliminate the redundancies, and properly connect sentences that were cut off mid-thought.
+- If necessary, you can move parts of sentences across the paragraph boundaries to make the content more logically coherent, focusing on smoothing the transition between paragraphs.
+- DO NOT alter any existing text within the paragraphs beyond addressing overlaps, unnatural breaks, and moving sentences at the paragraph boundaries.
+- DO NOT move any text between different pairs.
+- You MUST preserve ALL <image> tags (e.g., <image>10</image>) in pagraphs. <image> tags are crucial for synchronizing the text with visual elements. Their exact position must be maintained to ensure proper timing. DO NOT modify, or remove any <image> tags under any circumstances.
+Step 3. Explain the specific changes you are going to make for each pair and briefly describe why you are going to make these adjustments, with particular emphasis on how you handled the transition between paragraphs in <thinking> tag
+Step 4. Output the TWO revised paragraphs of ALL the {len(boundaries)} pairs in the following format in <result> tag:
+
+<result>
+<pair id=1>
+<paragraph id=1> revised paragraph 1 </paragraph>
+<paragraph id=2> revised paragraph 2 </paragraph>
+</pair>
+...
+</result>
+
+</instructions>
+"""
+
+        # A response cut off by the output limit or with malformed pairs misses some of the pairs, so it is not kept
+        # in the response cache
+        response = create_message(
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            max_tokens=4000,
+            stop_sequences=[],
+            model_id=self.fix_boundary_model_id,
+            validate=lambda response: THINKING_PATTERN.search(response) is not None and self._parse_fixed_pairs(response).keys() >= set(range(1, len(boundaries) + 1))
+        )
+        thinking = THINKING_PATTERN.search(response)
+        if thinking is not None:
+            logging.debug(f"_fix_paragraph_boundaries() Thinking: {thinking.group(1).strip()}")
+        fixed_pairs = self._parse_fixed_pairs(response)
+
+        fixed_boundaries = []
+        for pair_id, (paragraph1, paragraph2) in enumerate(boundaries, 1):
+            if pair_id in fixed_pairs:
+                p1, p2 = fixed_pairs[pair_id]
+                logging.debug(f"_fix_paragraph_boundaries() Priginal paragraphs:\n{paragraph1}\n{paragraph2}")
+                logging.debug(f"_fix_paragraph_boundaries() Fixed paragraphs:\n{p1}\n{p2}")
+            else:
+                logging.warning(f"Boundary fix result is missing for pair {pair_id}, fixing it in a separate request")
+                p1, p2 = self._fix_paragraph_boundary(paragraph1, paragraph2)
+            fixed_boundaries.append([p1, p2])
+        return fixed_boundaries
+
+    def _parse_fixed_pairs(self, response: str) -> dict[int, list[str]]:
+        if "<result>" not in response:
+            return {}
+        # The complete pairs of a response cut off before </result> are still used
+        result = response.rpartition("<result>")[2].partition("</result>")[0]
+        fixed_pairs: dict[int, list[str]] = {}
+        for pair_id, paragraph1, paragraph2 in PAIR_PATTERN.findall(result):
+            fixed_pairs.setdefault(int(pair_id), [paragraph1.strip(), paragraph2.strip()])
+        return fixed_pairs
+
     def _fix_paragraph_boundary(self, paragraph1: str, paragraph2: str) -> list[str]:
+        """Fix the boundary between a single pair of paragraphs."""
         prompt = f"""
 The following paragraphs are transcriptions of spoken content, divided by time segments with some overlap. As a result, there may be unnatural breaks or redundancies at the paragraph boundaries, especially between the last few seconds of the first paragraph and the first few seconds of the second paragraph.
 Please read them carefully and follow the instructions below:
@@ -290,14 +423,25 @@ Step 4. Output the TWO revised paragraphs in the following format in <result> ta
             temperature=0,
             max_tokens=4000,
             stop_sequences=[],
-            model_id=self.fix_boundary_model_id
+            model_id=self.fix_boundary_model_id,
+            validate=lambda response: self._parse_fixed_paragraphs(response) is not None
         )
-        result = response.split("<result>")[1].split("</result>")[0].strip()
-        thinking = response.split('<thinking>')[1].split('</thinking>')[0].strip()
-        p1 = result.split('<paragraph id=1>')[1].split('</paragraph>')[0].strip()
-        p2 = result.split('<paragraph id=2>')[1].split('</paragraph>')[0].strip()
-        logging.debug(f"_fix_paragraph_boundary() Thinking: {thinking}")
+        paragraphs = self._parse_fixed_paragraphs(response)
+        if paragraphs is None:
+            raise ValueError("No <result> tag with two paragraphs found in the boundary fix response")
+        p1, p2 = paragraphs
+        thinking = THINKING_PATTERN.search(response)
+        if thinking is not None:
+            logging.debug(f"_fix_paragraph_boundary() Thinking: {thinking.group(1).strip()}")
         logging.debug(f"_fix_paragraph_boundary() Priginal paragraphs:\n{paragraph1}\n{paragraph2}")
         logging.debug(f"_fix_paragraph_boundary() Fixed paragraphs:\n{p1}\n{p2}")
         return [p1, p2]
 
+    def _parse_fixed_paragraphs(self, response: str) -> Optional[list[str]]:
+        result = RESULT_PATTERN.search(response)
+        if result is None:
+            return None
+        paragraphs = PARAGRAPHS_PATTERN.search(result.group(1))
+        if paragraphs is None:
+            return None
+        return [paragraphs.group(1).strip(), paragraphs.group(2).strip()]
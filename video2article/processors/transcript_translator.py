@@ -1,13 +1,16 @@
 import logging
 import os
-from concurrent.futures import ThreadPoolExecutor
 import re
 
 from video2article.utils.bedrock import create_message
 from video2article.utils.types import Contents, ContentType, ImageContent, TextContent
 from video2article.utils.config import Config
+from video2article.utils.pool import get_executor
 from video2article.utils.language import adjust_text_length, get_language_name
 
+IMAGE_TAG_PATTERN = re.compile(r"<image>(\d+)</image>")
+RESULT_PATTERN = re.compile(r"<result>(.*?)</result>", re.DOTALL)
+
 class TranscriptTranslator:
     def __init__(self, config: Config):
         self.config = config
@@ -35,10 +38,10 @@ class TranscriptTranslator:
             f"Processing {total_segments} segments with {self.translate_max_workers} parallel workers"
         )
 
-        with ThreadPoolExecutor(max_workers=self.translate_max_workers) as executor:
-            results = list(
-                executor.map(self._translate_segment, range(total_segments), segments)
-            )
+        executor = get_executor("transcript_translator", self.translate_max_workers)
+        results = list(
+            executor.map(self._translate_segment, range(total_segments), segments)
+        )
 
         logging.debug(f"Translated content: {results}")
         translated_content = "\n\n".join([result for result in results if result])
@@ -70,8 +73,7 @@ class TranscriptTranslator:
     def _translate_segment(self, i, segment):
         logging.info(f"Segment {i+1}: Starting translation")
         source = "\n\n".join([paragraph for paragraph in segment if paragraph])
-        pattern = r"<image>(\d+)</image>"
-        image_ids = set(map(int, re.findall(pattern, source)))
+        image_ids = set(map(int, IMAGE_TAG_PATTERN.findall(source)))
         prompt = f"""I'm going to provide transcript of a presentation video in <transcript> tag and keywords extracted from presentation slides in <keywords> tag.
 Please read them carefully and follow ALL the instructions in <instructions></instructions> tag.
 
@@ -99,10 +101,12 @@ Please read them carefully and follow ALL the instructions in <instructions></in
             max_tokens=4000,
             stop_sequences=[],
             model_id=self.translate_model_id,
+            validate=lambda response: RESULT_PATTERN.search(response) is not None,
         )
-        translated_transcript = (
-            response.split("<result>")[1].split("</result>")[0].strip()
-        )
+        match = RESULT_PATTERN.search(response)
+        if match is None:
+            raise ValueError(f"Segment {i+1}: No <result> tag found in the translation response")
+        translated_transcript = match.group(1).strip()
         logging.info(f"Segment {i+1}: Completed translation")
         return translated_transcript
 
@@ -113,8 +117,7 @@ Please read them carefully and follow ALL the instructions in <instructions></in
         thumbnail_ids = set(thumbnail_contents.keys())
 
         # Extract all image tag IDs from revised_content
-        pattern = r"<image>(\d+)</image>"
-        content_ids = set(map(int, re.findall(pattern, revised_content)))
+        content_ids = set(map(int, IMAGE_TAG_PATTERN.findall(revised_content)))
 
         # Calculate the differences
         missing_ids = thumbnail_ids - content_ids
@@ -1,26 +1,76 @@
-import copy
+import asyncio
+import functools
 import json
 import logging
-from typing import Optional
+from typing import Callable, Optional
 
 import boto3
 from botocore.config import Config
 
+from video2article.utils.response_cache import cached_response
+
 DEFAULT_REGION = 'us-west-2'
+# Size of the HTTP connection pool of the shared client (botocore's default) until configure_bedrock_client is called
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+
+_max_pool_connections = DEFAULT_MAX_POOL_CONNECTIONS
+
+def configure_bedrock_client(max_pool_connections: int) -> None:
+    """
+    Set the size of the HTTP connection pool of the shared client
+
+    The pool must cover the largest number of concurrent calls, otherwise connections are discarded and
+    re-established with a new TLS handshake.
+
+    Args:
+        max_pool_connections: Maximum number of connections kept open
+    """
+    global _max_pool_connections
+    _max_pool_connections = max_pool_connections
+
+@functools.lru_cache(maxsize=None)
+def get_bedrock_client(region_name: str = DEFAULT_REGION, max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS):
+    """Get the Bedrock runtime client shared by all threads.
+
+    Sharing the client keeps its connections alive across calls, and lets the adaptive retry mode throttle
+    all callers together when Bedrock returns throttling errors.
+    """
+    session = boto3.Session()
+    return session.client(
+        service_name="bedrock-runtime",
+        region_name=region_name,
+        config=Config(
+            connect_timeout=150,
+            read_timeout=150,
+            max_pool_connections=max_pool_connections,
+            retries={'max_attempts': 10, 'mode': 'adaptive'})
+    )
+
+def _redact_message(message: dict[str, any]) -> dict[str, any]:
+    """Return the message with its image data replaced, or the message itself if it has no images."""
+    content = message.get('content')
+    if not isinstance(content, list) or not any(item.get('type') == 'image' and 'source' in item for item in content):
+        return message
+    return {
+        **message,
+        'content': [
+            {**item, 'source': {**item['source'], 'data': '[IMAGE DATA]'}}
+            if item.get('type') == 'image' and 'source' in item else item
+            for item in content
+        ]
+    }
 
 def sanitize_bedrock_request(data: dict[str, any]) -> dict[str, any]:
-    """Remove image data from the request for logging purposes."""
-    sanitized = copy.deepcopy(data)
+    """Remove image data from the request for logging purposes.
 
+    Only the messages and content items holding images are copied, everything else is shared with the request.
+    """
+    sanitized = {**data}
     if 'messages' in sanitized:
-        for message in sanitized['messages']:
-            if 'content' in message and isinstance(message['content'], list):
-                for item in message['content']:
-                    if item.get('type') == 'image' and 'source' in item:
-                        item['source']['data'] = '[IMAGE DATA]'
-
+        sanitized['messages'] = [_redact_message(message) for message in sanitized['messages']]
     return sanitized
 
+@cached_response
 def create_message(messages: list[dict[str, any]],
     system: str = "",
     temperature: float = 0,
@@ -29,15 +79,7 @@ def create_message(messages: list[dict[str, any]],
     model_id: str = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
 )-> str:
     """Generate a message using AWS Bedrock."""
-    session = boto3.Session()
-    client = session.client(
-        service_name="bedrock-runtime",
-        region_name=DEFAULT_REGION,
-        config=Config(
-            connect_timeout=150,
-            read_timeout=150,
-            retries={'max_attempts': 10})
-    )
+    client = get_bedrock_client(max_pool_connections=_max_pool_connections)
 
     body = {
         "anthropic_version": "bedrock-2023-05-31",
@@ -48,13 +90,43 @@ def create_message(messages: list[dict[str, any]],
         "messages": messages
     }
 
-    logging.debug("Calling Bedrock API: %s", sanitize_bedrock_request(body))
+    # Redacting the request walks the whole body, so it is skipped unless the debug log is written
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("Calling Bedrock API: %s", sanitize_bedrock_request(body))
 
+    # The body is serialized once by the C encoder and sent as is, botocore does not re-encode a string body
     response = client.invoke_model(
-        modelId=model_id, body=json.dumps(body)
+        modelId=model_id,
+        body=json.dumps(body, separators=(',', ':')),
+        contentType="application/json",
+        accept="application/json"
     )
 
     response_body = json.loads(response.get("body").read())
-    logging.debug("Response from Bedrock API: %s", response_body)
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("Response from Bedrock API: %s", response_body)
     completion = response_body["content"][0]["text"]
     return completion
+
+async def acreate_message(messages: list[dict[str, any]],
+    system: str = "",
+    temperature: float = 0,
+    max_tokens: int = 1024,
+    stop_sequences: Optional[list[str]] = None,
+    model_id: str = "us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+    validate: Optional[Callable[[str], bool]] = None
+)-> str:
+    """Generate a message using AWS Bedrock without blocking the event loop.
+
+    validate is passed to the response cache, see cached_response.
+    """
+    return await asyncio.to_thread(
+        create_message,
+        messages=messages,
+        system=system,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stop_sequences=stop_sequences,
+        model_id=model_id,
+        validate=validate
+    )
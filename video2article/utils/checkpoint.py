@@ -0,0 +1,62 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Mapping
+
+# Version of the checkpointed results, part of every checkpoint key. Bump it whenever a change to a stage's prompts,
+# parsing or result types makes earlier checkpoints invalid, otherwise they keep being reused.
+CHECKPOINT_VERSION = 2
+
+
+def _to_json(value: Any) -> Any:
+    """Convert values that json cannot encode, such as the read-only settings of Config"""
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+class CheckpointStore:
+    """Stores the results of pipeline stages on disk so that re-runs with the same inputs can skip them"""
+    def __init__(self, folder: Path):
+        self.folder = folder
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Compute a SHA256 key from JSON-serializable parts"""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False, default=_to_json).encode('utf-8')).hexdigest()
+
+    def load(self, stage: str, key: str) -> tuple[bool, Any]:
+        """
+        Load the checkpointed result of a stage
+
+        Args:
+            stage: Name of the stage
+            key: Key of the stage inputs
+
+        Returns:
+            Tuple of whether a checkpoint was found and the checkpointed result
+        """
+        path = self._get_path(stage, key)
+        if not path.exists():
+            return False, None
+        try:
+            with open(path, 'rb') as f:
+                return True, pickle.load(f)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+            return False, None
+
+    def save(self, stage: str, key: str, result: Any) -> None:
+        """Save the result of a stage"""
+        path = self._get_path(stage, key)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def _get_path(self, stage: str, key: str) -> Path:
+        return self.folder / f"{stage}-{key}.pkl"
@@ -1,10 +1,73 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterator, List, Mapping
+from collections import OrderedDict
 from pathlib import Path
+from types import MappingProxyType
+import threading
 import yaml
 from dataclasses import dataclass
-from video2article.utils.language import validate_language_code, get_language_name, LANGUAGE_MAPPING
+from video2article.utils.language import validate_language_code, get_language_name, AVAILABLE_LANGUAGES
 from video2article.utils.constants import OutputFormat, SourceType
 
+# The LibYAML bindings parse several times faster, but are only available when PyYAML was built with them
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# Maximum number of parsed YAML files kept in memory
+YAML_CACHE_SIZE = 100
+
+# Parsed and flattened YAML files by absolute path, with the modification time and size the file had when it was parsed
+_yaml_cache: "OrderedDict[str, tuple[int, int, Mapping[str, Any], Mapping[str, Any]]]" = OrderedDict()
+_yaml_cache_lock = threading.Lock()
+
+def _freeze(value: Any) -> Any:
+    """Make parsed YAML read-only, so that it can be shared between Config instances without copying"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _flatten(settings: Mapping[str, Any], prefix: str = "") -> Iterator[tuple[str, Any]]:
+    """Yield every value of nested settings, including the nested mappings, with its dot-separated key path"""
+    for key, value in settings.items():
+        if not isinstance(key, str):
+            continue
+        key_path = prefix + key
+        yield key_path, value
+        if isinstance(value, Mapping):
+            yield from _flatten(value, key_path + ".")
+
+def load_yaml_cached(path: Path) -> tuple[Mapping[str, Any], Mapping[str, Any]]:
+    """
+    Load a YAML file, reusing the parsed content while the file is unchanged
+
+    Args:
+        path: Path to the YAML file
+
+    Returns:
+        Read-only parsed content of the file, and the same content keyed by dot-separated key paths
+    """
+    key = str(path.resolve())
+    stat = path.stat()
+    with _yaml_cache_lock:
+        cached = _yaml_cache.get(key)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            _yaml_cache.move_to_end(key)
+            return cached[2], cached[3]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        content = _freeze(yaml.load(f, Loader=SafeLoader) or {})
+    flat_content = MappingProxyType(dict(_flatten(content)))
+
+    with _yaml_cache_lock:
+        _yaml_cache[key] = (stat.st_mtime_ns, stat.st_size, content, flat_content)
+        _yaml_cache.move_to_end(key)
+        if len(_yaml_cache) > YAML_CACHE_SIZE:
+            _yaml_cache.popitem(last=False)
+    return content, flat_content
+
 @dataclass
 class Config:
     video_title: str
@@ -16,6 +79,8 @@ class Config:
     source_language: str | None
     target_language: str
     transcribe_s3_bucket: Optional[str] = None
+    llm_cache: str = 'on'
+    enable_checkpoint: bool = False
 
     def __post_init__(self):
         self._load_settings()
@@ -31,11 +96,11 @@ class Config:
     
     def _load_settings(self) -> None:
         """Load settings from config.yaml"""
+        # The settings are shared by all Config instances loaded from the same file, so they are read-only
         if self.config_path.exists():
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                self.settings = yaml.safe_load(f)
+            self.settings, self._flat_settings = load_yaml_cached(self.config_path)
         else:
-            self.settings = {}
+            self.settings = self._flat_settings = MappingProxyType({})
     
     def _set_source_type(self) -> None:
         """Set source type based on settings"""
@@ -59,13 +124,10 @@ class Config:
         Raises:
             KeyError: If the configuration value is not found
         """
-        keys = key_path.split('.')
-        value = self.settings
-        for key in keys:
-            if not isinstance(value, dict) or key not in value:
-                raise KeyError(f"Config value not found in a yaml file: {key_path}")
-            value = value[key]
-        return value
+        try:
+            return self._flat_settings[key_path]
+        except KeyError:
+            raise KeyError(f"Config value not found in a yaml file: {key_path}") from None
 
     def set_source_language(self, language_code: str) -> None:
         """
@@ -99,4 +161,4 @@ class Config:
 
     def get_available_languages(self) -> List[str]:
         """Get a list of available language codes and their names"""
-        return [f"{code} ({name})" for code, name in LANGUAGE_MAPPING.items()]
+        return list(AVAILABLE_LANGUAGES)
@@ -1,3 +1,4 @@
+from types import MappingProxyType
 from typing import Literal, Optional, Dict, List
 import re
 
@@ -5,7 +6,7 @@ import re
 LanguageCode = Literal['en', 'zh-CN', 'es', 'ar', 'hi', 'fr', 'ja', 'pt', 'ru', 'de']
 
 # Language code to full name mapping
-LANGUAGE_MAPPING = {
+LANGUAGE_MAPPING = MappingProxyType({
     'en': 'English',
     'zh-CN': 'Chinese (Simplified)',
     'es': 'Spanish',
@@ -17,11 +18,11 @@ LANGUAGE_MAPPING = {
     'ru': 'Russian',
     'de': 'German',
     'kr': 'Korean'
-}
+})
 
 # Character count ratios for different languages (compared to English)
 # These values are approximate and may need adjustment
-CHARACTER_RATIOS = {
+CHARACTER_RATIOS = MappingProxyType({
     'en': 1.0,    # English (base)
     'zh-CN': 0.5, # Chinese (Simplified)
     'es': 1.2,    # Spanish
@@ -33,10 +34,10 @@ CHARACTER_RATIOS = {
     'ru': 1.1,    # Russian
     'de': 1.1,    # German
     'kr': 1.1     # Korean
-}
+})
 
 # Sentence ending patterns for different languages
-SENTENCE_ENDINGS = {
+SENTENCE_ENDINGS = MappingProxyType({
     'en': r'[.!?]',
     'zh-CN': r'[。！？]',
     'es': r'[.!?]',
@@ -48,10 +49,16 @@ SENTENCE_ENDINGS = {
     'ru': r'[.!?]',
     'de': r'[.!?]',
     'kr': r'[.!?]'
-}
+})
+
+# Patterns splitting text after the sentence endings of each language, compiled once
+SENTENCE_SPLIT_PATTERNS = MappingProxyType({
+    language: re.compile(f'({pattern}\\s+)') for language, pattern in SENTENCE_ENDINGS.items()
+})
+DEFAULT_SENTENCE_SPLIT_PATTERN = re.compile(r'([.!?]\s+)')
 
 # Transcribe language code to internal language code mapping
-TRANSCRIBE_TO_INTERNAL = {
+TRANSCRIBE_TO_INTERNAL = MappingProxyType({
     'en-US': 'en',
     'en-GB': 'en',
     'en-AU': 'en',
@@ -77,7 +84,11 @@ TRANSCRIBE_TO_INTERNAL = {
     'de-DE': 'de',
     'de-CH': 'de',
     'kr-KR': 'kr'
-}
+})
+
+# Supported languages as listed in error messages, built once
+AVAILABLE_LANGUAGES = tuple(f"{code} ({name})" for code, name in LANGUAGE_MAPPING.items())
+SUPPORTED_TRANSCRIBE_LANGUAGES = ', '.join(TRANSCRIBE_TO_INTERNAL)
 
 def validate_language_code(code: str) -> bool:
     """
@@ -163,8 +174,7 @@ def split_sentences(text: str, language: str) -> List[str]:
     Returns:
         List[str]: List of sentences
     """
-    pattern = SENTENCE_ENDINGS.get(language, r'[.!?]')
-    sentences = re.split(f'({pattern}\\s+)', text)
+    sentences = SENTENCE_SPLIT_PATTERNS.get(language, DEFAULT_SENTENCE_SPLIT_PATTERN).split(text)
     
     # Combine the sentence endings with their sentences
     result = []
@@ -191,5 +201,5 @@ def map_transcribe_language(transcribe_code: str) -> str:
     """
     internal_code = TRANSCRIBE_TO_INTERNAL.get(transcribe_code)
     if internal_code is None:
-        raise ValueError(f"Unsupported language detected: {transcribe_code}. Supported languages are: {', '.join(TRANSCRIBE_TO_INTERNAL.keys())}")
+        raise ValueError(f"Unsupported language detected: {transcribe_code}. Supported languages are: {SUPPORTED_TRANSCRIBE_LANGUAGES}")
     return internal_code 
\ No newline at end of file
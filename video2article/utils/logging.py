@@ -1,6 +1,7 @@
 import logging
 import os
 import json
+import time
 from typing import Literal
 
 class JSONFormatter(logging.Formatter):
@@ -8,6 +9,19 @@ class JSONFormatter(logging.Formatter):
     def __init__(self, uri: str):
         super().__init__()
         self.uri = uri
+        # Second of the last formatted record and its formatted date and time
+        self._time_cache: tuple[int, str] = (-1, "")
+
+    def formatTime(self, record, datefmt=None):
+        # Records logged within the same second share the date and time, only the milliseconds are formatted
+        if datefmt is not None:
+            return super().formatTime(record, datefmt)
+        second = int(record.created)
+        cached_second, cached_time = self._time_cache
+        if second != cached_second:
+            cached_time = time.strftime(self.default_time_format, self.converter(second))
+            self._time_cache = (second, cached_time)
+        return self.default_msec_format % (cached_time, record.msecs)
 
     def format(self, record):
         log_data = {
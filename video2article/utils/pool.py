@@ -0,0 +1,19 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+@functools.lru_cache(maxsize=None)
+def get_executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    """
+    Get the thread pool shared by all callers with the same name and size
+
+    The pool lives as long as the process, so it must not be shut down or used as a context manager.
+
+    Args:
+        name: Name of the pool, also used as the prefix of its thread names
+        max_workers: Maximum number of worker threads
+
+    Returns:
+        The shared thread pool
+    """
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
@@ -0,0 +1,126 @@
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Literal, Optional
+
+# 'on': cache deterministic (temperature 0) responses, 'force': cache all responses, 'off': disable the cache
+CacheMode = Literal['on', 'off', 'force']
+CACHE_MODES = ('on', 'off', 'force')
+
+
+class ResponseCache:
+    """Persistent cache of model responses keyed by a SHA256 hash of the request"""
+    def __init__(self, db_path: Path, mode: CacheMode = 'on'):
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response BLOB, ts INTEGER)")
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(request: dict[str, any]) -> str:
+        """Compute the cache key of a request"""
+        return hashlib.sha256(json.dumps(request, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def is_cacheable(self, temperature: float) -> bool:
+        """Check if a response generated with the given temperature may be cached"""
+        if self.mode == 'off':
+            return False
+        return self.mode == 'force' or temperature == 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def put(self, key: str, response: str) -> None:
+        data = zlib.compress(response.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, ts) VALUES (?, ?, ?)",
+                (key, data, int(time.time()))
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def configure_response_cache(db_path: Path, mode: CacheMode = 'on') -> None:
+    """
+    Enable the response cache for all functions decorated with cached_response
+
+    Args:
+        db_path: Path to the SQLite database file
+        mode: 'on', 'off' or 'force'
+    """
+    global _response_cache
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unsupported cache mode: {mode}. Supported modes are: {', '.join(CACHE_MODES)}")
+    _response_cache = ResponseCache(db_path, mode) if mode != 'off' else None
+
+
+def get_response_cache_stats() -> tuple[int, int]:
+    """Get the number of cache hits and misses"""
+    if _response_cache is None:
+        return 0, 0
+    return _response_cache.hits, _response_cache.misses
+
+
+def cached_response(func: Callable[..., str]) -> Callable[..., str]:
+    """
+    Serve the responses of a model call from the response cache when the same request was made before
+
+    The decorated function accepts an extra keyword argument, validate, that is not passed to the function nor part
+    of the cache key. It is called with the response and returns whether the caller can use it. Responses that fail
+    the check are not stored, and cached responses that fail it are removed and requested again, so that a malformed
+    response does not make every re-run fail the same way.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, validate: Optional[Callable[[str], bool]] = None, **kwargs) -> str:
+        cache = _response_cache
+        if cache is None:
+            return func(*args, **kwargs)
+
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        request = dict(bound.arguments)
+        if not cache.is_cacheable(request.get('temperature', 0)):
+            return func(*args, **kwargs)
+
+        key = cache.make_key(request)
+        response = cache.get(key)
+        if response is not None:
+            if validate is None or validate(response):
+                logging.debug(f"Response cache hit: {key}")
+                return response
+            logging.warning(f"Removing invalid cached response: {key}")
+            cache.delete(key)
+
+        response = func(*args, **kwargs)
+        if validate is None or validate(response):
+            cache.put(key, response)
+        return response
+
+    return wrapper
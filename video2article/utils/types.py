@@ -22,23 +22,33 @@ class ContentType(Enum):
     IMAGE = "image"
     SUBTITLE = "subtitle"
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TextContent:
     type: ContentType.TEXT
     value: str
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ImageContent:
     type: ContentType.IMAGE
     value: int
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SubtitleContent:
     type: ContentType.SUBTITLE
     value: str
 
 Content = TextContent | ImageContent | SubtitleContent
 
+# Serialized value of each content type, looked up without going through the enum's value property
+CONTENT_TYPE_VALUES = {content_type: content_type.value for content_type in ContentType}
+
+# Content class and type of each serialized content type
+CONTENT_CLASSES = {
+    ContentType.TEXT.value: (TextContent, ContentType.TEXT),
+    ContentType.IMAGE.value: (ImageContent, ContentType.IMAGE),
+    ContentType.SUBTITLE.value: (SubtitleContent, ContentType.SUBTITLE),
+}
+
 
 class Contents:
     def __init__(self, contents: Optional[list[Content]] = None):
@@ -65,8 +75,6 @@ class Contents:
         })
 
     def add_thumbnail_position(self, thumbnail_positions: list[dict[str, int]]) -> Contents:
-        new_contents = Contents()
-
         # Create a mapping of paragraph IDs to image IDs
         images_before_paragraphs = {
             pos['paragraph_id']: pos['image_id']
@@ -81,19 +89,20 @@ class Contents:
             if pos['paragraph_id'] is None
         ]
 
-        # Process contents and insert images where necessary
+        # Process contents and insert images where necessary, building the new list directly
+        contents = []
         for paragraph_index, content in enumerate(self.contents, 1):
             # Insert image before the paragraph if one exists
-            if paragraph_index in images_before_paragraphs:
-                image_id = images_before_paragraphs[paragraph_index]
-                new_contents.add_content(ImageContent(type=ContentType.IMAGE, value=image_id))
+            image_id = images_before_paragraphs.get(paragraph_index)
+            if image_id is not None:
+                contents.append(ImageContent(type=ContentType.IMAGE, value=image_id))
 
             # Add the original content
-            new_contents.add_content(content)
+            contents.append(content)
 
         # Add remaining images at the end
-        for image_id in images_at_end:
-            new_contents.add_content(ImageContent(type=ContentType.IMAGE, value=image_id))
+        contents.extend(ImageContent(type=ContentType.IMAGE, value=image_id) for image_id in images_at_end)
+        new_contents = Contents(contents)
 
         # Copy metadata
         new_contents.title = self.title
@@ -113,7 +122,7 @@ class Contents:
     def to_dict(self) -> dict[str, any]:
         return {
             "contents": [
-                {"type": content.type.value, "value": content.value}
+                {"type": CONTENT_TYPE_VALUES[content.type], "value": content.value}
                 for content in self.contents
             ],
             "url": self.url,
@@ -134,14 +143,11 @@ class Contents:
     def from_dict(cls, data: dict[str, any]) -> Contents:
         contents = []
         for item in data['contents']:
-            if item['type'] == ContentType.TEXT.value:
-                contents.append(TextContent(type=ContentType.TEXT, value=item['value']))
-            elif item['type'] == ContentType.IMAGE.value:
-                contents.append(ImageContent(type=ContentType.IMAGE, value=item['value']))
-            elif item['type'] == ContentType.SUBTITLE.value:
-                contents.append(SubtitleContent(type=ContentType.SUBTITLE, value=item['value']))
-            else:
-                raise ValueError(f"Unknown content type: {item['type']}")
+            try:
+                content_class, content_type = CONTENT_CLASSES[item['type']]
+            except KeyError:
+                raise ValueError(f"Unknown content type: {item['type']}") from None
+            contents.append(content_class(type=content_type, value=item['value']))
 
         result = cls(contents)
         result.url = data.get('url')
@@ -1,19 +1,52 @@
 import os
+import functools
 import logging
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotocoreConfig
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import json
 import webvtt
 from datetime import timedelta, datetime
-import time
 import requests
 import cv2
 from video2article.utils.constants import THUMBNAIL_INTERVAL
 from webvtt import WebVTT
 from video2article.utils.config import Config
-from video2article.utils.language import map_transcribe_language, TRANSCRIBE_TO_INTERNAL
+from video2article.utils.language import map_transcribe_language, SUPPORTED_TRANSCRIBE_LANGUAGES
 import asyncio
+from collections import deque
+from video2article.utils.pool import get_executor
+
+# Videos are uploaded in parts of this size, several at a time. The defaults (8 MB parts, 10 at a time) leave the
+# uplink idle between parts of multi-GB videos. Parts must stay under 10,000 per file, which 16 MB allows up to 160 GB.
+MULTIPART_CHUNK_SIZE = 16 * 1024 * 1024
+MAX_TRANSFER_CONCURRENCY = 20
+UPLOAD_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_CHUNK_SIZE,
+    multipart_chunksize=MULTIPART_CHUNK_SIZE,
+    max_concurrency=MAX_TRANSFER_CONCURRENCY,
+)
+
+TRANSCRIPTION_TIMEOUT = 300  # Maximum time to wait for a transcription job in seconds
+# The job status is polled with a growing delay: short jobs are noticed quickly, long jobs are polled less often
+TRANSCRIPTION_POLL_INITIAL_DELAY = 1.0  # seconds
+TRANSCRIPTION_POLL_MAX_DELAY = 30.0  # seconds
+TRANSCRIPTION_POLL_BACKOFF = 1.5
+
+@functools.lru_cache(maxsize=None)
+def get_aws_client(service_name: str, region_name: Optional[str] = None):
+    """Get the client of an AWS service shared by all video sources in the process.
+
+    Creating a client resolves credentials and loads the service model, so it is done once per service and region.
+    The connection pool is sized for the concurrent parts of an S3 transfer.
+    """
+    return boto3.Session().client(
+        service_name,
+        region_name=region_name,
+        config=BotocoreConfig(max_pool_connections=MAX_TRANSFER_CONCURRENCY)
+    )
 
 class FileSource:
     def __init__(self, config: Config) -> None:
@@ -26,8 +59,8 @@ class FileSource:
         if config.transcribe_s3_bucket is None:
             raise ValueError("S3 bucket not found")
         self.s3_bucket = config.transcribe_s3_bucket
-        self.transcribe_client = boto3.client('transcribe')
-        self.s3_client = boto3.client('s3')
+        self.transcribe_client = get_aws_client('transcribe')
+        self.s3_client = get_aws_client('s3')
 
     async def load(self) -> None:
         """Load and process the video file"""
@@ -36,7 +69,7 @@ class FileSource:
         
         # Upload video to S3
         s3_key = f"videos/{self.video_file_name}.mp4"
-        self.s3_client.upload_file(self.video_path, self.s3_bucket, s3_key)
+        self.s3_client.upload_file(self.video_path, self.s3_bucket, s3_key, Config=UPLOAD_CONFIG)
         s3_uri = f"s3://{self.s3_bucket}/{s3_key}"
         
         # Start transcription job with timestamp
@@ -53,21 +86,10 @@ class FileSource:
         )
 
         # Wait for transcription to complete (timeout after 5 minutes)
-        start_time = time.time()
-        timeout = 300  # 5 minutes in seconds
-        
-        while True:
-            status = self.transcribe_client.get_transcription_job(
-                TranscriptionJobName=job_name
-            )
-            if status['TranscriptionJob']['TranscriptionJobStatus'] in ['COMPLETED', 'FAILED']:
-                break
-                
-            # Check if timeout reached
-            if time.time() - start_time > timeout:
-                raise Exception("Transcription process timed out (5 minutes)")
-                
-            await asyncio.sleep(5)
+        try:
+            status = await asyncio.wait_for(self._wait_for_transcription_job(job_name), timeout=TRANSCRIPTION_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise Exception("Transcription process timed out (5 minutes)") from None
 
         if status['TranscriptionJob']['TranscriptionJobStatus'] == 'FAILED':
             raise Exception("Transcription job failed")
@@ -81,7 +103,7 @@ class FileSource:
             logging.info(f"Mapped language: {self.config.source_language}")
         except ValueError as e:
             logging.error(str(e))
-            raise ValueError(f"Transcription detected an unsupported language. Please use one of the supported languages: {', '.join(TRANSCRIBE_TO_INTERNAL.keys())}")
+            raise ValueError(f"Transcription detected an unsupported language. Please use one of the supported languages: {SUPPORTED_TRANSCRIBE_LANGUAGES}")
 
         # Get VTT file from S3
         vtt_key = f"transcripts/{job_name}.vtt"
@@ -98,17 +120,34 @@ class FileSource:
 
         # Delete video and transcript files from S3 after processing
         try:
-            # Delete uploaded video file
-            self.s3_client.delete_object(Bucket=self.s3_bucket, Key=s3_key)
-            # Delete transcript JSON file
+            # Delete the uploaded video file and the transcript JSON and VTT files in a single request
             transcript_json_key = f"transcripts/{job_name}.json"
-            self.s3_client.delete_object(Bucket=self.s3_bucket, Key=transcript_json_key)
-            # Delete transcript VTT file
-            self.s3_client.delete_object(Bucket=self.s3_bucket, Key=vtt_key)
+            response = self.s3_client.delete_objects(
+                Bucket=self.s3_bucket,
+                Delete={
+                    'Objects': [{'Key': s3_key}, {'Key': transcript_json_key}, {'Key': vtt_key}],
+                    'Quiet': True
+                }
+            )
+            # delete_objects reports the objects it failed to delete instead of raising
+            errors = response.get('Errors', [])
+            if errors:
+                raise Exception(", ".join(f"{error['Key']}: {error.get('Message', error.get('Code'))}" for error in errors))
             logging.info("Deleted video and transcript files from S3.")
         except Exception as e:
             logging.error(f"Failed to delete S3 files: {str(e)}")
 
+    async def _wait_for_transcription_job(self, job_name: str) -> Dict[str, Any]:
+        """Poll the transcription job until it is completed or failed, and return its last status"""
+        delay = TRANSCRIPTION_POLL_INITIAL_DELAY
+        while True:
+            # The request runs in a thread, so that the timeout can cancel the wait while a request is in flight
+            status = await asyncio.to_thread(self.transcribe_client.get_transcription_job, TranscriptionJobName=job_name)
+            if status['TranscriptionJob']['TranscriptionJobStatus'] in ['COMPLETED', 'FAILED']:
+                return status
+            await asyncio.sleep(delay)
+            delay = min(delay * TRANSCRIPTION_POLL_BACKOFF, TRANSCRIPTION_POLL_MAX_DELAY)
+
     def _extract_thumbnails(self) -> None:
         """Extract thumbnails from the video file at regular intervals"""
         logging.info("Extracting thumbnails")
@@ -125,15 +164,25 @@ class FileSource:
             duration = total_frames / fps
 
             self.thumbnail_ids = list(range(0, int(duration), THUMBNAIL_INTERVAL))
+            # Frames are encoded and written in the background while the next ones are decoded. OpenCV releases
+            # the GIL while encoding, and read() returns a new array for each frame, so no copy is needed.
+            # The number of frames waiting to be written is bounded to keep memory flat on long videos.
+            max_workers = os.cpu_count() or 1
+            executor = get_executor("thumbnail_writer", max_workers)
+            pending_writes = deque()
+            compression_params = [cv2.IMWRITE_JPEG_QUALITY, 60]
             for id in self.thumbnail_ids:
                 video.set(cv2.CAP_PROP_POS_MSEC, id * 1000)
                 success, frame = video.read()
                 if success:
                     thumbnail_path = thumbnail_folder / f"thumbnail_{id}.jpg"
-                    compression_params = [cv2.IMWRITE_JPEG_QUALITY, 60]
-                    cv2.imwrite(str(thumbnail_path), frame, compression_params)
-                    logging.debug(f"Thumbnail saved: {thumbnail_path}")
+                    if len(pending_writes) >= 2 * max_workers:
+                        pending_writes.popleft().result()
+                    pending_writes.append(executor.submit(cv2.imwrite, str(thumbnail_path), frame, compression_params))
+                    logging.debug(f"Thumbnail queued: {thumbnail_path}")
             video.release()
+            for future in pending_writes:
+                future.result()
 
         except Exception as e:
             logging.error(f"Error extracting thumbnails: {str(e)}")